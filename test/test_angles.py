@@ -23,30 +23,16 @@ import pytest
 import random
 from veerer import VeeringTriangulation, RED, BLUE, PURPLE, GREEN
 
-@pytest.mark.parametrize("fp, cols",
-[
- ("(0,1,2)", "RRB"),
- ("(0,1,2)", "BBR"),
- ("(0,1,2)", "PBR"),
- ("(0,1,2)", "GRB"),
- ("(0,1,2)", "RPG"),
- ("(0,1,2)", "BGP")
-])
-def test_triangle(fp, cols):
-    V = VeeringTriangulation(fp, cols)
-    assert V.angles() == [1, 1, 1, 1], V
+COLOURS = ["RRB", "BBR", "PBR", "GRB", "RPG", "BGP"]
 
-@pytest.mark.parametrize("fp, cols",
-[
- ("(0,1,2)(~0,~1,~2)", "RRB"),
- ("(0,1,2)(~0,~1,~2)", "BBR"),
- ("(0,1,2)(~0,~1,~2)", "PBR"),
- ("(0,1,2)(~0,~1,~2)", "GRB"),
- ("(0,1,2)(~0,~1,~2)", "RPG"),
- ("(0,1,2)(~0,~1,~2)", "BGP")
-])
-def test_torus(fp, cols):
-    V = VeeringTriangulation(fp, cols)
-    assert V.angles() == [2], V
+def test_triangle():
+    for cols in COLOURS:
+        V = VeeringTriangulation("(0,1,2)", cols)
+        assert V.angles() == [1, 1, 1, 1], V
+
+def test_torus():
+    for cols in COLOURS:
+        V = VeeringTriangulation("(0,1,2)(~0,~1,~2)", cols)
+        assert V.angles() == [2], V
 
 if __name__ == '__main__': sys.exit(pytest.main(sys.argv))
@@ -21,7 +21,7 @@ import sys
 import pytest
 
 import random
-from veerer import VeeringTriangulation, VeeringFlipSequence
+from veerer import env, VeeringTriangulation, VeeringFlipSequence
 
 def test_Q_p4():
     T = VeeringTriangulation("(0,1,2)", "PBR")
@@ -82,4 +82,21 @@ def test_Q_11_p5():
         h = g.inverse()
         assert f.is_identical(h), (f, h)
 
+def test_self_check():
+    Vc = VeeringTriangulation("(0,~5,4)(3,5,6)(1,2,~6)", "PPBPRBR")
+    Vr = VeeringTriangulation("(0,6,5)(1,2,~6)(3,4,~5)", "BPBBRPR")
+
+    R3 = VeeringFlipSequence(Vc, "0B 3B", "(0,3)")
+    R5 = VeeringFlipSequence(Vr, "1B", "(1,2)")
+    R1 = VeeringFlipSequence(Vr, "1R 5R", "(0,2,3)(1,4)(5,6)")
+    R2 = VeeringFlipSequence(Vr, "5B")
+
+    old_check = env.CHECK
+    env.CHECK = True
+    try:
+        for f in [R1 * R5, R5 * R1 * R1, R3 * R5**2 * R2, (R1 * R2 * R3)**3]:
+            f.inverse().inverse()
+    finally:
+        env.CHECK = old_check
+
 if __name__ == '__main__': sys.exit(pytest.main(sys.argv))
@@ -65,6 +65,17 @@ def test_power_torus():
     A = B*R*B
     assert (A**2)**3 == (A**3)**2
 
+def test_power_repeated_product():
+    T = VeeringTriangulation("(0,1,2)(~0,~1,~2)", "PBR")
+    B = VeeringFlipSequence(T, "0B", "(1,0,~1,~0)(2,~2)")
+    R = VeeringFlipSequence(T, "0R", "(0,2)(1,~1)")
+
+    A = B * R * B
+    P = VeeringFlipSequence(T)
+    for k in range(12):
+        assert A**k == P, k
+        P = P * A
+
 def test_power_Q_11_m5():
     Vc = VeeringTriangulation("(0,~5,4)(3,5,6)(1,2,~6)", "PPBPRBR")
     Vr = VeeringTriangulation("(0,6,5)(1,2,~6)(3,4,~5)", "BPBBRPR")
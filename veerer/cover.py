@@ -160,7 +160,7 @@ class TriangulationCover(object):
         d = self._d
         vp = self._t.vertex_permutation(copy=False)
         ep = self._t.edge_permutation(copy=False)
-        cvp = array('l', [-1] * (d * n))
+        cvp = array('l', [-1]) * (d * n)
 
         for a in range(n):
             b = vp[a]
@@ -180,7 +180,7 @@ class TriangulationCover(object):
         d = self._d
         ep = self._t.edge_permutation(copy=False)
         c = self._c
-        cep = array('l', [-1] * (d * n))
+        cep = array('l', [-1]) * (d * n)
 
         for a in range(n):
             b = ep[a]
@@ -197,7 +197,7 @@ class TriangulationCover(object):
         n = self._t.num_half_edges()
         d = self._d
         fp = self._t.face_permutation(copy=False)
-        cfp = array('l', [-1] * (d * n))
+        cfp = array('l', [-1]) * (d * n)
 
         for a in range(n):
             b = fp[a]
@@ -57,16 +57,45 @@ The same flip sequence defined in one line::
 
 from __future__ import absolute_import
 
-from .constants import colour_from_char, colour_to_char, RED, BLUE, PURPLE, GREEN, HORIZONTAL, VERTICAL
-from .permutation import perm_init, perm_check, perm_id, perm_is_one, perm_preimage, perm_invert, perm_cycle_string, perm_compose, perm_pow, perm_conjugate
+from array import array
+
+from .constants import colour_to_char, RED, BLUE, PURPLE, GREEN, HORIZONTAL, VERTICAL, COLOURS
+from .permutation import perm_init, perm_check, perm_id, perm_is_one, perm_invert, perm_cycle_string, perm_compose, perm_pow, perm_conjugate
 from .veering_triangulation import VeeringTriangulation
+from . import env
 from .env import require_package, sage, ppl
 
+_COLOUR_CHARS = {col: colour_to_char(col) for col in COLOURS}
+
 def flip_sequence_to_string(sequence):
-    return " ".join("%d%s" % (e, colour_to_char(col)) for e,col in sequence)
+    r"""
+    EXAMPLES::
+
+        sage: from veerer.flip_sequence import flip_sequence_to_string
+        sage: from veerer import RED, BLUE
+        sage: flip_sequence_to_string([(1, RED), (0, BLUE), (12, RED)])
+        '1R 0B 12R'
+    """
+    return " ".join(str(e) + _COLOUR_CHARS[col] for e,col in sequence)
+
+_CHAR_COLOURS = {c: col for col, c in _COLOUR_CHARS.items()}
 
 def flip_sequence_from_string(s):
-    return [(int(f[:-1]), colour_from_char(f[-1])) for f in s.split()]
+    r"""
+    EXAMPLES::
+
+        sage: from veerer.flip_sequence import flip_sequence_from_string
+        sage: flip_sequence_from_string("1R 0B  12R")
+        [(1, 1), (0, 2), (12, 1)]
+        sage: flip_sequence_from_string("1R 0X")
+        Traceback (most recent call last):
+        ...
+        ValueError: unknown color 'X'
+    """
+    try:
+        return [(int(f[:-1]), _CHAR_COLOURS[f[-1]]) for f in s.split()]
+    except KeyError as err:
+        raise ValueError("unknown color '%s'" % err.args[0])
 
 class VeeringFlipSequence(object):
     r"""
@@ -90,7 +119,22 @@ class VeeringFlipSequence(object):
         VeeringFlipSequence(VeeringTriangulation("(0,1,2)(~2,~0,~1)", "RRB"), "1R 0R", "(0)(1)(2)(~2)(~1)(~0)")
         sage: VeeringFlipSequence(T, [(1, RED), (0, RED)])
         VeeringFlipSequence(VeeringTriangulation("(0,1,2)(~2,~0,~1)", "RRB"), "1R 0R", "(0)(1)(2)(~2)(~1)(~0)")
+
+    The consistency check replaying the whole sequence after each
+    composition, power or inversion is only run when ``veerer.env.CHECK``
+    is set::
+
+        sage: from veerer import env
+        sage: env.CHECK = True
+        sage: F * F
+        VeeringFlipSequence(VeeringTriangulation("(0,1,2)(~2,~0,~1)", "RRB"), "1R 0R 1R 0R", "(0)(1)(2)(~2)(~1)(~0)")
+        sage: env.CHECK = False
     """
+    __slots__ = ['_start', '_end', '_canon',
+                 '_relabelling', '_relabelling_inv', '_relabelling_is_id',
+                 '_flip_edges', '_flip_cols', '_flip_oldcols',
+                 '_end_colouring_cache', '_coloured_start_cache', '_repr_cache']
+
     def __init__(self, start, sequence=None, relabelling=None, reduced=None):
         if not isinstance(start, VeeringTriangulation):
             raise TypeError("'start' must be a VeeringTriangulation")
@@ -105,8 +149,18 @@ class VeeringFlipSequence(object):
         if reduced:
             self._start.forgot_forward_flippable_colour()
         self._end = self._start.copy()
+        # canonical edge representative of each half-edge (the edge
+        # permutation is the same for all triangulations in the sequence)
+        ep = self._start._ep
+        self._canon = [min(e, ep[e]) for e in range(self._start._n)]
         self._relabelling = perm_id(self._start._n)
-        self._flips = []   # list of triples (e, col_after, col_before)
+        self._relabelling_inv = perm_id(self._start._n)
+        self._relabelling_is_id = True
+        # the flips (e, col_after, col_before) stored as three arrays
+        self._flip_edges = array('l')
+        self._flip_cols = array('l')
+        self._flip_oldcols = array('l')
+        self._reset_cache()
 
         if sequence is not None:
             if isinstance(sequence, str):
@@ -121,16 +175,20 @@ class VeeringFlipSequence(object):
         Iteration through triples ``(veering triangulation, edge, color)``.
         """
         V = self._start.copy()
-        for e, col, _ in self._flips:
+        for e, col in zip(self._flip_edges, self._flip_cols):
             yield (V, e, col)
             V.flip(e, col)
 
     def _check(self):
-        T = VeeringFlipSequence(self._start, [f[:2] for f in self._flips], self._relabelling)
+        T = VeeringFlipSequence(self._start, self.flips(), self._relabelling)
 
         assert T._start == self._start, (T._start, self._start)
         assert T._relabelling == self._relabelling, (T._relabelling, self._relabelling)
-        assert T._flips == self._flips, (T._flips, self._flips)
+        assert self._relabelling_inv == perm_invert(self._relabelling, self._start._n), (self._relabelling, self._relabelling_inv)
+        assert self._relabelling_is_id == perm_is_one(self._relabelling, self._start._n), (self._relabelling, self._relabelling_is_id)
+        assert T._flip_edges == self._flip_edges, (T._flip_edges, self._flip_edges)
+        assert T._flip_cols == self._flip_cols, (T._flip_cols, self._flip_cols)
+        assert T._flip_oldcols == self._flip_oldcols, (T._flip_oldcols, self._flip_oldcols)
         assert T._end == self._end, (T._end, self._end)
 
     def __repr__(self):
@@ -149,29 +207,32 @@ class VeeringFlipSequence(object):
             sage: VeeringFlipSequence(T, "1R 0R", relabelling="(0,5)(1,3)", reduced=True)
             VeeringFlipSequence(VeeringTriangulation("(0,1,2)(~2,~0,~1)", "RPB"), "1R 0R", "(0,~0)(1,~2)(2,~1)")
         """
-        args = [repr(self._start)]
-        args.append("\"%s\"" % flip_sequence_to_string(self.flips()))
-        args.append("\"%s\"" % perm_cycle_string(self._relabelling, self._end._n, involution=self._end._ep))
-        return "VeeringFlipSequence({})".format(", ".join(args))
+        if self._repr_cache is None:
+            args = [repr(self._start)]
+            args.append("\"%s\"" % flip_sequence_to_string(zip(self._flip_edges, self._flip_cols)))
+            args.append("\"%s\"" % perm_cycle_string(self._relabelling, self._end._n, involution=self._end._ep))
+            self._repr_cache = "VeeringFlipSequence({})".format(", ".join(args))
+        return self._repr_cache
 
     # properties
     def is_identical(self, other):
         if type(self) is not type(other):
             raise TypeError
-        return self._start == other._start and \
-               self._end == other._end and \
-               self._flips == other._flips and \
-               self._relabelling == other._relabelling
+        if self is other:
+            return True
+        # cheap comparisons first
+        return len(self._flip_edges) == len(other._flip_edges) and \
+               self._flip_edges == other._flip_edges and \
+               self._flip_cols == other._flip_cols and \
+               self._relabelling == other._relabelling and \
+               self._flip_oldcols == other._flip_oldcols and \
+               self._start == other._start and \
+               self._end == other._end
 
     def __eq__(self, other):
         # TODO: implement equality of mapping class... not of the sequence itself.
         # This is rather simple: check start, end, compute the matrices, compare.
-        if type(self) is not type(other):
-            raise TypeError
-        return self._start == other._start and \
-               self._end == other._end and \
-               self._flips == other._flips and \
-               self._relabelling == other._relabelling
+        return self.is_identical(other)
 
     def __ne__(self, other):
         return not (self == other)
@@ -190,12 +251,30 @@ class VeeringFlipSequence(object):
 
     def copy(self):
         F = VeeringFlipSequence.__new__(VeeringFlipSequence)
-        F._start = self._start.copy()
+        # NOTE: the start is never modified after construction
+        F._start = self._start
+        F._canon = self._canon
         F._end = self._end.copy()
-        F._flips = self._flips[:]
-        F._relabelling = self._relabelling
+        F._flip_edges = self._flip_edges[:]
+        F._flip_cols = self._flip_cols[:]
+        F._flip_oldcols = self._flip_oldcols[:]
+        F._relabelling = self._relabelling[:]
+        F._relabelling_inv = self._relabelling_inv[:]
+        F._relabelling_is_id = self._relabelling_is_id
+        # cached values are never modified in place, they can be shared
+        F._end_colouring_cache = self._end_colouring_cache
+        F._coloured_start_cache = self._coloured_start_cache
+        F._repr_cache = self._repr_cache
         return F
 
+    def _reset_cache(self):
+        r"""
+        Forget the cached data. To be called after each modification.
+        """
+        self._end_colouring_cache = None
+        self._coloured_start_cache = None
+        self._repr_cache = None
+
     def matrix(self, twist=True):
         require_package('sage', 'matrix')
         from sage.rings.all import ZZ
@@ -226,35 +305,44 @@ class VeeringFlipSequence(object):
             sage: (L32 * CR5 * CL5).end_colouring()
             array('l', [1, 2, 2, 1, 1, 2, 1])
         """
+        if self._end_colouring_cache is not None:
+            return self._end_colouring_cache[:]
+
         ne = self._end.num_edges()
         ep = self._end._ep
         colours = self._end._colouring[:ne]
         undetermined = set(i for i in range(ne) if colours[i] == PURPLE)
 
         # run backward through flipped edges
-        i = len(self._flips) - 1
-        while i >= 0 and undetermined:
-            e, col, oldcol = self._flips[i]
-            e = self._relabelling[e]
+        r = self._relabelling
+        for e, col in zip(reversed(self._flip_edges), reversed(self._flip_cols)):
+            if not undetermined:
+                break
+            e = r[e]
             if e >= ne:
                 e = ep[e]
             if e in undetermined:
                 undetermined.remove(e)
                 colours[e] = col
-            i -= 1
 
         # for unflipped edges, look at colours of the initial triangulation
+        rinv = self._relabelling_inv
+        start_colouring = self._start._colouring
         for e in undetermined:
-            re = perm_preimage(self._relabelling, e)
-            col = self._start._colouring[re]
+            re = rinv[e]
+            col = start_colouring[re]
             if col != PURPLE:
                 if re >= ne:
                     re = ep[re]
                 colours[e] = col
 
+        self._end_colouring_cache = colours[:]
         return colours
 
     def coloured_start(self):
+        if self._coloured_start_cache is not None:
+            return self._coloured_start_cache.copy()
+
         V = self._start.copy()
         ne = V.num_edges()
         if any(V._colouring[e] == PURPLE for e in range(ne)):
@@ -264,6 +352,7 @@ class VeeringFlipSequence(object):
                     if colours[e] == PURPLE:
                         raise ValueError("undetermined colour e={}".format(e))
                     V.set_edge_colour(e, colours[e])
+        self._coloured_start_cache = V.copy()
         return V
 
     def inverse(self):
@@ -283,56 +372,78 @@ class VeeringFlipSequence(object):
         start = self._start
         reduced = any(start._colouring[e] == PURPLE for e in range(start.num_edges()))
         if reduced:
-            # determine the coloured flip sequence
-            coloured_flips = []
+            # determine the colours before each flip
+            oldcols = array('l')
             V = self.coloured_start()
-            for e, col, _ in self._flips:
-                coloured_flips.append((e, col, V.edge_colour(e)))
+            for e, col in zip(self._flip_edges, self._flip_cols):
+                oldcols.append(V.edge_colour(e))
                 V.flip(e, col)
             V.relabel(self._relabelling)
 
-            # TODO: remove check
-            W = V.copy()
-            W.forgot_forward_flippable_colour()
-            assert W == self._end
+            if env.CHECK:
+                W = V.copy()
+                W.forgot_forward_flippable_colour()
+                assert W == self._end
         else:
-            coloured_flips = self._flips
+            oldcols = self._flip_oldcols
             V = self._end.copy()
 
-        assert all(oldcol == BLUE or oldcol == RED for (_, _, oldcol) in coloured_flips)
-        inverse_flips = [(self._relabelling[e], BLUE if oldcol == RED else RED) for (e, _, oldcol) in reversed(coloured_flips)]
+        assert all(oldcol == BLUE or oldcol == RED for oldcol in oldcols)
+        inverse_flips = [(self._relabelling[e], BLUE if oldcol == RED else RED) for e, oldcol in zip(reversed(self._flip_edges), reversed(oldcols))]
 
         # NOTE: the relabelling might need some conjugation by edge flip
         # (more precisely, the edge flipped an odd number of times are
         #  flipped)
+        # NOTE: the swaps of distinct edges commute so that we only need
+        # the parity of the number of flips of each edge
+        n = self._start._n
         ep = self._start._ep
-        ne = self._start.num_edges()
-        c = perm_id(self._start._n)
-        for i,_ in inverse_flips:
-            c[i], c[ep[i]] = c[ep[i]], c[i]
-        r = perm_invert(self._relabelling, self._start._n)
-        r = perm_compose(c, r, self._start._n)
+        canon = self._canon
+        odd = bytearray(n)
+        for e, _ in inverse_flips:
+            odd[canon[e]] ^= 1
+        c = perm_id(n)
+        for e in range(n):
+            if odd[e]:
+                E = ep[e]
+                c[e] = E
+                c[E] = e
+        r = perm_compose(c, self._relabelling_inv, n)
 
         V.rotate()
         F = VeeringFlipSequence(V, inverse_flips, r, reduced=reduced)
 
-        # TODO: remove this expensive check
-        F._check()
+        if env.CHECK:
+            F._check()
 
         return F
 
     def matrix_inverse(self, twist=True):
-        require_package('sage', 'matrix')
-        from sage.rings.all import ZZ
-        from sage.matrix.special import identity_matrix
-        m = identity_matrix(ZZ, self._start.num_edges())
-        V = self._start.copy()
-        V.relabel_homological_action(perm_invert(self._relabelling, self._start._n), m, twist)
-        for e, col, oldcol in reversed(self._flips):
-            pass
+        r"""
+        Return the homological action of the inverse of this flip sequence.
+
+        .. TODO::
+
+            This needs the homological action of backward flips which is
+            not available in :class:`~veerer.triangulation.Triangulation`.
+            Note that ``self.inverse().matrix()`` is not a replacement: the
+            inverse flip sequence lives on the rotated triangulation and its
+            matrix is the action on widths, not the inverse of
+            :meth:`matrix`.
+
+        EXAMPLES::
+
+            sage: from veerer import VeeringTriangulation, VeeringFlipSequence
+            sage: F = VeeringFlipSequence(VeeringTriangulation("(0,1,2)", "BBR"), "0R 2B", "(0,2,1)")
+            sage: F.matrix_inverse()
+            Traceback (most recent call last):
+            ...
+            NotImplementedError: the homological action of the inverse of a flip sequence is not supported
+        """
+        raise NotImplementedError("the homological action of the inverse of a flip sequence is not supported")
 
     def flips(self):
-        return [flip[:2] for flip in self._flips]
+        return list(zip(self._flip_edges, self._flip_cols))
 
     def is_closed(self):
         return self._start == self._end
@@ -385,31 +496,27 @@ class VeeringFlipSequence(object):
             raise TypeError
         n = self._start.num_edges()
         ep = self._start._ep
-        flipped = set(x[0] for x in self._flips)
-        if len(flipped) == n:
-            return set()
+        flipped = bytearray(n)
+        for e in self._flip_edges:
+            flipped[e] = 1
+        new = [e for e in range(n) if flipped[e]]
+        num_flipped = len(new)
 
-        new = list(flipped)
         very_new = []
-        modified = True
         r = self._relabelling
-        while len(flipped) < n and modified:
-            modified = False
+        while num_flipped < n and new:
             for e in new:
                 e = r[e]
                 if e >= n:
                     e = ep[e]
-                if e not in flipped:
-                    modified = True
-                    flipped.add(e)
+                if not flipped[e]:
+                    flipped[e] = 1
                     very_new.append(e)
+            num_flipped += len(very_new)
             new, very_new = very_new, new
             del very_new[:]
 
-        E = set(range(n))
-        assert flipped.issubset(E)
-        E.difference_update(flipped)
-        return E
+        return set(e for e in range(n) if not flipped[e])
 
     def is_pseudo_anosov(self):
         r"""
@@ -531,29 +638,20 @@ class VeeringFlipSequence(object):
                     hrmax = x
                     hmmax = mult * m
                     hfacmax = fac
-        assert hrmax is not None, hroots
+        assert hrmax is not None, hp
         r = hrmax
 
-        # TODO: it is a bit stupid to do twice the same computation
+        # NOTE: the dilatation on widths is the same algebraic number r so
+        # that we do not need to factor the characteristic polynomial of wm
+        # (the polynomials are apparently not always equal)
         wm = self.inverse().matrix() # matrix: widths_end -> widths_start
-        wp = wm.charpoly()
-        wroots = wp.roots(AA, multiplicities=True)
-        wimax = wrmax = None
-        for (fac,mult) in wp.factor():
-            for (x,m) in fac.roots(AA):
-                if wrmax is None or (x > 0 and x > wrmax):
-                    wrmax = x
-                    wmmax = mult * m
-                    wfacmax = fac
-        assert wrmax is not None, wroots
-
-        assert wrmax == r, (hroots, wroots)
-
-        # NOTE: the polynomials are apparently not always equal
-        # assert wp == hp, (wp, hp)
+        if env.CHECK:
+            wp = wm.charpoly()
+            wrmax = max(x for x in wp.roots(AA, multiplicities=False) if x > 0)
+            assert wrmax == r, (hp, wp)
 
         from sage.rings.number_field.number_field import NumberField
-        K = NumberField(wfacmax, 'a', embedding=wrmax)
+        K = NumberField(hfacmax, 'a', embedding=hrmax)
         r = K.gen()
 
         h = (hm - r).right_kernel_matrix()[0]
@@ -567,24 +665,33 @@ class VeeringFlipSequence(object):
 
         return r, self.coloured_start()._flat_structure_from_train_track_lengths(h, w, base_ring=K)
 
+    def _edge_pullback(self, r):
+        r"""
+        Return the list ``pb`` so that ``pb[e]`` is the canonical edge
+        representative of the half-edge ``r[e]`` in the start triangulation.
+
+        This is the table used to move a flip across the relabelling ``r``.
+        """
+        canon = self._canon
+        return [canon[r[e]] for e in range(self._start.num_edges())]
+
     # change
     def append_flip(self, e, col):
         r"""
         Append the flip ``(e, col)`` to this flip sequence.
         """
-        ep = self._end._ep
-        oldcol = self._end._colouring[e]
-        E = ep[e]
-        if E < e:
-            e = E
-        self._end.flip(e, col)
+        end = self._end
+        canon = self._canon
+        oldcol = end._colouring[e]
+        e = canon[e]
+        end.flip(e, col)
         if self._relabelling[e] != e:
             # push the flip to the left of relabelling
-            e = perm_preimage(self._relabelling, e)
-            E = ep[e]
-            if E < e:
-                e = E
-        self._flips.append((e, col, oldcol))
+            e = canon[self._relabelling_inv[e]]
+        self._flip_edges.append(e)
+        self._flip_cols.append(col)
+        self._flip_oldcols.append(oldcol)
+        self._reset_cache()
 
     def swap(self, e):
         r"""
@@ -594,9 +701,13 @@ class VeeringFlipSequence(object):
         self._end.swap(e)
         self._relabelling[e] = E
         self._relabelling[E] = e
+        self._relabelling_inv[E] = e
+        self._relabelling_inv[e] = E
+        self._relabelling_is_id = perm_is_one(self._relabelling, self._end._n)
+        self._reset_cache()
 
-        # TODO: remove check
-        self._check()
+        if env.CHECK:
+            self._check()
 
     def find_closure(self):
         r"""
@@ -628,7 +739,14 @@ class VeeringFlipSequence(object):
                 raise ValueError('invalid relabelling permutation')
 
         end.relabel(r)
-        self._relabelling = perm_compose(self._relabelling, r)
+        if self._relabelling_is_id:
+            self._relabelling = r[:end._n]
+            self._relabelling_inv = perm_invert(r, end._n)
+        else:
+            self._relabelling = perm_compose(self._relabelling, r)
+            self._relabelling_inv = perm_compose(perm_invert(r, end._n), self._relabelling_inv)
+        self._relabelling_is_id = perm_is_one(self._relabelling, end._n)
+        self._reset_cache()
 
     def __imul__(self, other):
         r"""
@@ -648,16 +766,26 @@ class VeeringFlipSequence(object):
         if self._end != other._start:
             raise ValueError("composition undefined")
 
-        n = self._start._n
-        ne = self._start.num_edges()
-        r = perm_invert(self._relabelling, n)
-        ep = self._start._ep
-        self._flips.extend([((r[e] if r[e] < ne else ep[r[e]]), col, oldcol) for e, col, oldcol in other._flips])
+        if self._relabelling_is_id:
+            self._flip_edges.extend(other._flip_edges)
+        else:
+            pb = self._edge_pullback(self._relabelling_inv)
+            self._flip_edges.extend(array('l', map(pb.__getitem__, other._flip_edges)))
+        self._flip_cols.extend(other._flip_cols)
+        self._flip_oldcols.extend(other._flip_oldcols)
         self._end = other._end.copy()
-        self._relabelling = perm_compose(self._relabelling, other._relabelling)
-
-        # TODO: remove this expensive check!!
-        self._check()
+        if self._relabelling_is_id:
+            self._relabelling = other._relabelling[:]
+            self._relabelling_inv = other._relabelling_inv[:]
+            self._relabelling_is_id = other._relabelling_is_id
+        elif not other._relabelling_is_id:
+            self._relabelling = perm_compose(self._relabelling, other._relabelling)
+            self._relabelling_inv = perm_compose(other._relabelling_inv, self._relabelling_inv)
+            self._relabelling_is_id = perm_is_one(self._relabelling)
+        self._reset_cache()
+
+        if env.CHECK:
+            self._check()
         return self
 
     def __mul__(self, other):
@@ -689,16 +817,34 @@ class VeeringFlipSequence(object):
             return self
 
         res = self.copy()
-        res._relabelling = perm_pow(res._relabelling, k)
+        res._reset_cache()
+        # NOTE: the arrays are allocated with their final length
+        res._flip_edges = edges = self._flip_edges * k
+        res._flip_cols = self._flip_cols * k
+        res._flip_oldcols = self._flip_oldcols * k
+        if self._relabelling_is_id:
+            if env.CHECK:
+                res._check()
+            return res
 
-        m = len(res._flips)
-        r = perm_invert(self._relabelling, self._start._n)
-        ne = self._start.num_edges()
-        ep = self._start._ep
-        for _ in range(m * (k-1)):
-            e, col, oldcol = res._flips[-m]
-            res._flips.append(((r[e] if r[e] < ne else ep[r[e]]), col, oldcol))
-
-        # TODO: remove this expensive check
-        res._check()
+        res._relabelling = perm_pow(res._relabelling, k)
+        res._relabelling_inv = perm_pow(res._relabelling_inv, k)
+        res._relabelling_is_id = perm_is_one(res._relabelling)
+
+        # the flips of the i-th period are obtained from the ones of the
+        # first period by moving them i times across the relabelling. We
+        # double the number of periods at each step so that only O(log(k))
+        # tables need to be built.
+        m = len(self._flip_edges)
+        q = self._edge_pullback(self._relabelling_inv)
+        done = 1    # number of correct periods in edges (q moves across done periods)
+        while 2 * done <= k:
+            edges[done * m: 2 * done * m] = array('l', map(q.__getitem__, edges[:done * m]))
+            q = [q[e] for e in q]
+            done *= 2
+        if done < k:
+            edges[done * m:] = array('l', map(q.__getitem__, edges[:(k - done) * m]))
+
+        if env.CHECK:
+            res._check()
         return res
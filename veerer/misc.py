@@ -45,7 +45,7 @@ def flipper_isometry_to_perm(isom, ep, inv=False):
     """
     from array import array
     n = isom.zeta
-    p = array('l', [-1]*(2*n))
+    p = array('l', [-1]) * (2*n)
     if inv:
         dic = isom.inverse_label_map
     else:
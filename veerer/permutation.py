@@ -812,12 +812,12 @@ def perm_invert(l, n=None):
     """
     if n is None:
         n = len(l)
-    res = array('l', [0]*n)
-    for i in range(n):
-        if l[i] == -1:
+    res = array('l', [0]) * n
+    for i, j in enumerate(l[:n]):
+        if j == -1:
             res[i] = -1
         else:
-            res[l[i]] = i
+            res[j] = i
     return res
 
 def perm_compose(p1, p2, n=None):
@@ -841,28 +841,46 @@ def perm_compose(p1, p2, n=None):
     """
     if n is None:
         n = len(p1)
-    r = array('l', [-1] * n)
-    for i in range(n):
-        if p1[i] != -1:
-            r[i] = p2[p1[i]]
-    return r
+    return array('l', [-1 if j == -1 else p2[j] for j in p1[:n]])
 
 perm_compose_00 = perm_compose
 
 # TODO: do something less stupid
 # (do it for each cycle independently, detecting if needed period)
 def perm_pow(p, k, n=None):
+    r"""
+    Return the ``k``-th power of the permutation ``p``.
+
+    The power is computed by repeated squaring.
+
+    EXAMPLES::
+
+        sage: from veerer.permutation import perm_pow, perm_init
+
+        sage: p = perm_init("(0,1,2,3,4)(5,6)")
+        sage: perm_pow(p, 0)
+        array('l', [0, 1, 2, 3, 4, 5, 6])
+        sage: perm_pow(p, 1)
+        array('l', [1, 2, 3, 4, 0, 6, 5])
+        sage: perm_pow(p, 2)
+        array('l', [2, 3, 4, 0, 1, 5, 6])
+        sage: perm_pow(p, 13)
+        array('l', [3, 4, 0, 1, 2, 6, 5])
+    """
     if n is None:
         n = len(p)
     if k == 0:
         return perm_id(n)
 
-    q = p[:]
-    k -= 1
-    while k:
-        q = perm_compose(q, p)
-        k -= 1
-    return q
+    res = None
+    q = p
+    while True:
+        if k & 1:
+            res = q[:] if res is None else perm_compose(res, q, n)
+        k >>= 1
+        if not k:
+            return res
+        q = perm_compose(q, q, n)
 
 def perm_compose_10(p1, p2, n=None):
     r"""
@@ -959,9 +977,9 @@ def perm_conjugate(p1, p2, n=None):
     """
     if n is None:
         n = len(p1)
-    res = array('l', [-1] * n)
-    for i in range(n):
-        res[p2[i]] = p2[p1[i]]
+    res = array('l', [-1]) * n
+    for i, j in zip(p2[:n], p1[:n]):
+        res[i] = p2[j]
     return res
 
 #####################################################################
@@ -6,6 +6,7 @@ from six.moves import range, map, filter, zip
 
 from array import array
 from .permutation import *
+from . import env
 from .env import require_package, flipper, curver
 
 def face_edge_perms_init(data):
@@ -1024,8 +1025,8 @@ class Triangulation(object):
         vp[e] = E_vp
         vp[E] = e_vp
 
-        # TODO: remove check
-        self._check()
+        if env.CHECK:
+            self._check()
 
     def relabel(self, p):
         r"""
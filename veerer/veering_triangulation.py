@@ -54,9 +54,9 @@ def ppl_cone_from_hashable(args):
     d, eqns, ieqs = args
     P = ppl.C_Polyhedron(d)
     for constraint in eqns:
-        P.add_constraint(sum(coeff * ppl.Variable(i) for i,coeff in enumerate(constraint)) == 0)
+        P.add_constraint(ppl.Linear_Expression(constraint, 0) == 0)
     for constraint in ieqs:
-        P.add_constraint(sum(coeff * ppl.Variable(i) for i,coeff in enumerate(constraint)) >= 0)
+        P.add_constraint(ppl.Linear_Expression(constraint, 0) >= 0)
     return P
 
 def relabel_on_edges(ep, r, n, m):
@@ -72,21 +72,26 @@ def relabel_on_edges(ep, r, n, m):
     - m - num edges
 
     OUTPUT: list of length m
+
+    EXAMPLES::
+
+        sage: from veerer.veering_triangulation import relabel_on_edges
+        sage: relabel_on_edges([5, 4, 3, 2, 1, 0], [1, 5, 2, 3, 0, 4], 6, 3)
+        [1, 0, 2]
     """
     if len(r) < n:
         raise ValueError
     rr = [-1] * m
-    for i in range(m):
-        if ep[i] < i:
+    for i, E in enumerate(ep[:m]):
+        if E < i:
             raise ValueError("not in canonical form")
         j = r[i]
-        k = r[ep[i]]
-        if (j >= m and k >= m):
+        k = r[E]
+        if k < j:
+            j = k
+        if j >= m:
             raise ValueError("relabelling not in canonical form")
-        if j < k:
-            rr[i] = j
-        else:
-            rr[i] = k
+        rr[i] = j
     return rr
 
 class VeeringTriangulation(Triangulation):
@@ -585,12 +590,18 @@ class VeeringTriangulation(Triangulation):
     def __eq__(self, other):
         if type(self) != type(other):
             raise TypeError
-        return Triangulation.__eq__(self, other) and self._colouring == other._colouring
+        return (self._n == other._n and
+                self._colouring == other._colouring and
+                self._fp == other._fp and
+                self._ep == other._ep)
 
     def __ne__(self, other):
         if type(self) != type(other):
             raise TypeError
-        return Triangulation.__ne__(self, other) or self._colouring != other._colouring
+        return (self._n != other._n or
+                self._colouring != other._colouring or
+                self._fp != other._fp or
+                self._ep != other._ep)
 
     def to_core(self, slope=VERTICAL):
         r"""
@@ -1527,11 +1538,14 @@ class VeeringTriangulation(Triangulation):
         for start_edge in self._automorphism_good_starts():
             relabelling = self._relabelling_from(start_edge)
 
-            # relabelled data
-            fp = perm_conjugate(self._fp, relabelling)
-            ep = perm_conjugate(self._ep, relabelling)
+            # relabelled data (colours first, so that losing candidates are
+            # discarded before conjugating the permutations)
             cols = self._colouring[:]
             perm_on_list(relabelling, cols)
+            if best is not None and cols > best[0]:
+                continue
+            fp = perm_conjugate(self._fp, relabelling)
+            ep = perm_conjugate(self._ep, relabelling)
 
             T = (cols, fp, ep)
             if best is None or T < best:
@@ -3484,14 +3498,22 @@ class VeeringTriangulation(Triangulation):
         if P.affine_dimension() != 2 * dim:
             raise ValueError('not geometric or invalid constraints')
 
+        # the (normalized) edges a and d of the square about each forward
+        # flippable edge e, computed once for both passes below
+        norm = self._norm
+        flippable = self.forward_flippable_edges()
+        sides = {}
+        for e in flippable:
+            a,b,c,d = self.square_about_edge(e)
+            sides[e] = (norm(a), norm(d))
+
         # constructing the Delaunay facets
         # (this is only a subset of the facets)
         delaunay_facets = {}
-        for e in self.forward_flippable_edges():
-            a,b,c,d = self.square_about_edge(e)
-
+        for e in flippable:
+            a, d = sides[e]
             Q = ppl.C_Polyhedron(P)
-            Q.add_constraint(x[self._norm(e)] == y[self._norm(a)] + y[self._norm(d)])
+            Q.add_constraint(x[norm(e)] == y[a] + y[d])
             if Q.affine_dimension() == 2*dim - 1:
                 hQ = ppl_cone_to_hashable(Q)
                 if hQ not in delaunay_facets:
@@ -3499,19 +3521,27 @@ class VeeringTriangulation(Triangulation):
                 delaunay_facets[hQ][1].append(e)
 
         # computing colouring of the new triangulations
+        # (depth-first over the colourings of the edges of each facet: the
+        # constraints of a common prefix are shared and a branch is dropped
+        # as soon as its polytope is not a facet anymore)
         neighbours = []
         for Q, edges in delaunay_facets.values():
-            for cols in product([BLUE, RED], repeat=len(edges)):
-                S = ppl.C_Polyhedron(Q)
-                Z = list(zip(edges, cols))
-                for e,col in Z:
-                    a,b,c,d = self.square_about_edge(e)
+            branches = [(Q, [])]
+            while branches:
+                S, Z = branches.pop()
+                if len(Z) == len(edges):
+                    neighbours.append(Z)
+                    continue
+                e = edges[len(Z)]
+                a, d = sides[e]
+                for col in (RED, BLUE):
+                    S1 = ppl.C_Polyhedron(S)
                     if col == RED:
-                        S.add_constraint(x[self._norm(a)] <= x[self._norm(d)])
+                        S1.add_constraint(x[a] <= x[d])
                     else:
-                        S.add_constraint(x[self._norm(a)] >= x[self._norm(d)])
-                if S.affine_dimension() == 2*dim - 1:
-                    neighbours.append(Z)
+                        S1.add_constraint(x[a] >= x[d])
+                    if S1.affine_dimension() == 2*dim - 1:
+                        branches.append((S1, Z + [(e, col)]))
 
         return neighbours
 